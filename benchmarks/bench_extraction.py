@@ -0,0 +1,365 @@
+"""
+Ozon Review Parser - Extraction Benchmark
+==============================================
+Офлайн-бенчмарк JS-извлечения отзыва (parse_active_review_adaptive)
+
+Фикстуры модалок из benchmarks/fixtures раздаются локальным HTTP-сервером
+и открываются в headless Chrome. Для каждой фикстуры замеряется латентность
+вызова (внутри страницы и полный round trip через WebDriver) и проверяется
+корректность uuid, автора, даты, рейтинга и медиа по expected.json.
+Результаты сравниваются с baseline.json - отдельно для каждого режима
+(library / inline); без baseline для режима запуск завершается ошибкой.
+
+Запуск:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --iterations 200
+    python benchmarks/bench_extraction.py --update-baseline
+    python benchmarks/bench_extraction.py --inline   # старый способ: скрипт целиком на каждый вызов
+    python benchmarks/bench_extraction.py --rating   # микро-бенчмарк: рейтинг scoped vs legacy
+
+
+
+Author: https://github.com/KalmikOF
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+EXPECTED_PATH = os.path.join(BENCH_DIR, "expected.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+LEGACY_RATING_PATH = os.path.join(BENCH_DIR, "legacy_rating.js")
+
+# Импорт парсера из корня репозитория
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+import ozon_parser  # noqa: E402
+
+# Проверяемые поля отзыва
+CHECKED_FIELDS = ("review_uuid", "author", "date", "rating", "images", "videos")
+
+
+def start_fixture_server():
+    """Раздаёт fixtures/ на 127.0.0.1 (случайный порт)"""
+    handler = partial(QuietHandler, directory=FIXTURES_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def setup_bench_driver(headless=True):
+    """Чистый Chrome без selenium-wire и профиля - только для замеров"""
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    # Активный отзыв должен оказаться правее 900px, а badge - на своём месте
+    options.add_argument("--window-size=1600,1000")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-dev-shm-usage")
+    # Картинки фикстур указывают на CDN - не грузим их
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2
+    })
+    return webdriver.Chrome(options=options)
+
+
+def get_extractor_script(inline=False):
+    """
+    JS, который замеряется - тот же, что использует парсер
+    
+    По умолчанию вызывается точка входа установленной JS-библиотеки,
+    inline=True пересылает весь скрипт извлечения на каждый вызов.
+    """
+    if inline:
+        return (
+            "function activeReview() {" + ozon_parser.ACTIVE_REVIEW_SCRIPT + "}\n"
+            "function findRating(review) {" + ozon_parser.FIND_RATING_SCRIPT + "}\n"
+            + ozon_parser.PARSE_REVIEW_SCRIPT
+        )
+    return "return window.__ozonParser.parseActiveReview();"
+
+
+def build_timed_script(script):
+    """Оборачивает скрипт замером performance.now() внутри страницы"""
+    return (
+        "let __t0 = performance.now();"
+        "let __r = (function() {" + script + "\n})();"
+        "return {result: __r, ms: performance.now() - __t0};"
+    )
+
+
+def check_review(review, expected):
+    """Возвращает список расхождений с ожидаемыми полями"""
+    if not review or not review.get('found'):
+        return [f"not found: {review.get('error') if review else None}"]
+
+    finalized = dict(review)
+    ozon_parser.finalize_media([finalized])
+
+    mismatches = []
+    for field in CHECKED_FIELDS:
+        if field not in expected:
+            continue
+        if finalized.get(field) != expected[field]:
+            mismatches.append(f"{field}: {finalized.get(field)!r} != {expected[field]!r}")
+    return mismatches
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def bench_fixture(driver, url, script, iterations, warmup):
+    """Прогоняет скрипт на одной фикстуре"""
+    driver.get(url)
+    driver.execute_script(ozon_parser.OZON_JS_LIBRARY)
+    timed_script = build_timed_script(script)
+
+    for _ in range(warmup):
+        driver.execute_script(timed_script)
+
+    page_ms = []
+    roundtrip_ms = []
+    last_result = None
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = driver.execute_script(timed_script)
+        roundtrip_ms.append((time.perf_counter() - start) * 1000)
+        page_ms.append(response['ms'])
+        last_result = response['result']
+
+    return {
+        'page_ms_median': round(statistics.median(page_ms), 4),
+        'page_ms_p95': round(percentile(page_ms, 0.95), 4),
+        'roundtrip_ms_median': round(statistics.median(roundtrip_ms), 4),
+        'roundtrip_ms_p95': round(percentile(roundtrip_ms, 0.95), 4),
+        'iterations': iterations
+    }, last_result
+
+
+# Инвалидация стилей перед каждым замером рейтинга: на живой странице DOM
+# меняется между вызовами, и getComputedStyle вынужден пересчитывать стили
+RATING_VARIANTS = {
+    'scoped': (
+        "let review = window.__ozonParser.activeReview();"
+        "if (arguments[0]) document.body.classList.toggle('__bench');"
+        "let t0 = performance.now();"
+        "let r = window.__ozonParser.findRating(review);"
+        "return {result: r, ms: performance.now() - t0};"
+    ),
+    'legacy': (
+        "if (arguments[0]) document.body.classList.toggle('__bench');"
+        "let t0 = performance.now();"
+        "let r = window.__benchLegacyRating();"
+        "return {result: r, ms: performance.now() - t0};"
+    )
+}
+
+
+def bench_rating(driver, url, iterations, warmup, dirty=True):
+    """Микро-бенчмарк рейтинга: поиск от активного отзыва против скана всех svg"""
+    driver.get(url)
+    driver.execute_script(ozon_parser.OZON_JS_LIBRARY)
+    with open(LEGACY_RATING_PATH, 'r', encoding='utf-8') as f:
+        driver.execute_script(f.read() + "\nwindow.__benchLegacyRating = legacyRating;")
+
+    stats = {}
+    for variant, script in RATING_VARIANTS.items():
+        for _ in range(warmup):
+            driver.execute_script(script, dirty)
+        timings = []
+        result = None
+        for _ in range(iterations):
+            response = driver.execute_script(script, dirty)
+            timings.append(response['ms'])
+            result = response['result']
+        stats[variant] = {
+            'ms_median': round(statistics.median(timings), 4),
+            'ms_p95': round(percentile(timings, 0.95), 4),
+            'rating': result
+        }
+
+    svg_count = driver.execute_script("return document.getElementsByTagName('svg').length;")
+    return stats, svg_count
+
+
+def run_rating_bench(args, expected, base_url):
+    """Режим --rating: сравнение scoped и legacy рейтинга по всем фикстурам"""
+    driver = setup_bench_driver(headless=not args.headful)
+    wrong = 0
+
+    print("=" * 80)
+    print("  OZON PARSER - МИКРО-БЕНЧМАРК РЕЙТИНГА (scoped vs legacy)")
+    print("=" * 80)
+
+    try:
+        for name in sorted(expected):
+            stats, svg_count = bench_rating(
+                driver, f"{base_url}/{name}", args.iterations, args.warmup
+            )
+            scoped, legacy = stats['scoped'], stats['legacy']
+            ok = scoped['rating'] == expected[name]['rating']
+            wrong += 0 if ok else 1
+            speedup = legacy['ms_median'] / scoped['ms_median'] if scoped['ms_median'] else float('inf')
+            print(
+                f"{'✅' if ok else '❌'} {name:<22} svg: {svg_count:>5}   "
+                f"scoped: {scoped['ms_median']:8.4f} ms   legacy: {legacy['ms_median']:8.4f} ms   "
+                f"x{speedup:.1f}   рейтинг: {scoped['rating']} (legacy {legacy['rating']})"
+            )
+    finally:
+        driver.quit()
+
+    return 1 if wrong else 0
+
+
+def load_baselines(path):
+    """baseline.json → {режим: отчёт} (старый файл с одним отчётом - по его mode)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if 'fixtures' in data:
+        return {data.get('mode', 'library'): data}
+    return data.get('modes', {})
+
+
+def save_baseline(path, report):
+    """Записывает отчёт в baseline своего режима, остальные режимы не трогает"""
+    baselines = load_baselines(path)
+    baselines[report['mode']] = report
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'modes': baselines}, f, ensure_ascii=False, indent=2)
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Ищет замедления медианы внутри страницы относительно baseline"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get('fixtures', {}).get(name)
+        if not base:
+            continue
+        limit = base['page_ms_median'] * (1 + tolerance)
+        # Игнорируем шум на суб-миллисекундных значениях
+        if stats['page_ms_median'] > limit and stats['page_ms_median'] - base['page_ms_median'] > 0.05:
+            regressions.append(
+                f"{name}: {stats['page_ms_median']:.3f} ms > {base['page_ms_median']:.3f} ms "
+                f"(+{tolerance * 100:.0f}% допуск)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ozon Parser - бенчмарк JS-извлечения отзывов')
+    parser.add_argument('--iterations', type=int, default=50, help='Замеров на фикстуру')
+    parser.add_argument('--warmup', type=int, default=5, help='Прогревочных вызовов')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Допустимое замедление (доля)')
+    parser.add_argument('--baseline', type=str, default=BASELINE_PATH, help='Путь к baseline.json')
+    parser.add_argument('--update-baseline', action='store_true', help='Перезаписать baseline')
+    parser.add_argument('--headful', action='store_true', help='Показывать окно браузера')
+    parser.add_argument('--output', type=str, help='Сохранить результаты в JSON')
+    parser.add_argument('--inline', action='store_true', help='Пересылать весь скрипт на каждый вызов')
+    parser.add_argument('--rating', action='store_true', help='Микро-бенчмарк рейтинга: scoped vs legacy')
+    args = parser.parse_args()
+
+    with open(EXPECTED_PATH, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+
+    server = start_fixture_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    if args.rating:
+        try:
+            return run_rating_bench(args, expected, base_url)
+        finally:
+            server.shutdown()
+
+    driver = setup_bench_driver(headless=not args.headful)
+    script = get_extractor_script(inline=args.inline)
+
+    results = {}
+    failures = {}
+
+    print("=" * 80)
+    print("  OZON PARSER - БЕНЧМАРК ИЗВЛЕЧЕНИЯ ОТЗЫВА")
+    print("=" * 80)
+
+    try:
+        for name in sorted(expected):
+            stats, review = bench_fixture(
+                driver, f"{base_url}/{name}", script, args.iterations, args.warmup
+            )
+            mismatches = check_review(review, expected[name])
+            stats['correct'] = not mismatches
+            results[name] = stats
+            if mismatches:
+                failures[name] = mismatches
+
+            mark = "✅" if not mismatches else "❌"
+            print(
+                f"{mark} {name:<22} page: {stats['page_ms_median']:8.3f} ms "
+                f"(p95 {stats['page_ms_p95']:.3f})   "
+                f"round trip: {stats['roundtrip_ms_median']:8.3f} ms "
+                f"(p95 {stats['roundtrip_ms_p95']:.3f})"
+            )
+            for m in mismatches:
+                print(f"      ↳ {m}")
+    finally:
+        driver.quit()
+        server.shutdown()
+
+    report = {
+        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'iterations': args.iterations,
+        'mode': 'inline' if args.inline else 'library',
+        'fixtures': results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    regressions = []
+    baseline = load_baselines(args.baseline).get(report['mode'])
+    if args.update_baseline:
+        save_baseline(args.baseline, report)
+        print(f"\n💾 Baseline ({report['mode']}) сохранён: {args.baseline}")
+    elif baseline is None:
+        # Без baseline сравнивать не с чем - это ошибка, а не молчаливый успех
+        regressions = [f"нет baseline для режима {report['mode']} "
+                       f"(записать: --update-baseline{' --inline' if args.inline else ''})"]
+        print(f"\n❌ {regressions[0]}")
+    else:
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        print(f"\n📏 Сравнение с baseline ({report['mode']}) от {baseline.get('created_at', '?')}")
+        if regressions:
+            for r in regressions:
+                print(f"   🐢 {r}")
+        else:
+            print("   ✅ Замедлений нет")
+
+    print(f"\n{'✅' if not failures else '❌'} Корректность: {len(results) - len(failures)}/{len(results)}")
+
+    return 1 if failures or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
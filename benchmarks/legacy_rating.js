@@ -0,0 +1,68 @@
+// Старый алгоритм рейтинга: скан ВСЕХ svg документа,
+// getBoundingClientRect + getComputedStyle, скользящее окно из 5 звёзд.
+// Используется только в бенчмарке для сравнения (bench_extraction.py --rating).
+function legacyRating() {
+    let allSvgs = document.querySelectorAll('svg');  // ← DOCUMENT, не review!
+    let badgeStars = [];
+    
+    // Ищем звёзды в верхней части (где badge)
+    for (let svg of allSvgs) {
+        let rect = svg.getBoundingClientRect();
+        
+        // Звёзды badge: top 60-100px, размер 15-25px
+        if (rect.top >= 60 && rect.top <= 100 && 
+            rect.width >= 15 && rect.width <= 25 && 
+            rect.height >= 15 && rect.height <= 25) {
+            
+            let style = window.getComputedStyle(svg);
+            let color = style.color;
+            
+            // Оранжевая или серая звезда
+            if (color.includes('255, 165, 0') || color.includes('0, 26, 52')) {
+                badgeStars.push({
+                    svg: svg,
+                    left: rect.left,
+                    top: rect.top,
+                    isFilled: color.includes('255, 165, 0')
+                });
+            }
+        }
+    }
+    
+    // Сортируем по left (горизонтальная линия)
+    badgeStars.sort(function(a, b) {
+        return a.left - b.left;
+    });
+    
+    // Находим группу из 5 звёзд подряд на одной линии
+    let rating = 0;
+    if (badgeStars.length >= 5) {
+        for (let i = 0; i <= badgeStars.length - 5; i++) {
+            let group = badgeStars.slice(i, i + 5);
+            
+            // Проверяем, что 5 звёзд на одной линии (top разница < 5px)
+            let minTop = Math.min(...group.map(function(s) { return s.top; }));
+            let maxTop = Math.max(...group.map(function(s) { return s.top; }));
+            
+            // И расстояние между звёздами одинаковое (~20px)
+            let leftDiffs = [];
+            for (let j = 1; j < group.length; j++) {
+                leftDiffs.push(group[j].left - group[j-1].left);
+            }
+            let avgDiff = leftDiffs.reduce(function(a, b) { return a + b; }, 0) / leftDiffs.length;
+            
+            // Условия: на одной линии И равные промежутки (18-22px)
+            if (maxTop - minTop < 5 && avgDiff >= 18 && avgDiff <= 22) {
+                // Это группа рейтинга badge!
+                for (let j = 0; j < group.length; j++) {
+                    if (group[j].isFilled) {
+                        rating++;
+                    }
+                }
+                break;
+            }
+        }
+    }
+    
+    return rating;
+}
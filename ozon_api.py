@@ -0,0 +1,225 @@
+"""
+Ozon Review Parser - Async API
+==============================================
+Программный интерфейс: отзывы отдаются потоком по мере парсинга.
+
+    import asyncio
+    from ozon_api import scrape
+
+    async def consume(urls):
+        async for item in scrape(urls, concurrency=3):
+            if item['event'] == 'review':
+                await store(item['review'])
+            elif item['event'] == 'product':
+                print(item['product_name'], item['success'])
+
+Браузеры работают в пуле потоков (run_in_executor) через тот же
+ScrapeEngine, что и консольный парсер. Очередь событий ограничена:
+если потребитель не успевает, браузеры ждут перед следующим отзывом.
+Выход из async for (break / отмена задачи) останавливает браузеры.
+
+Журнал движка идёт в logging (логгер LOGGER_NAME), а не в stdout. У каждого
+вызова свои профили Chrome: параллельные scrape() в одном процессе не
+делят папки профилей.
+
+
+
+Author: https://github.com/KalmikOF
+"""
+
+import uuid
+import shutil
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+from ozon_parser import (
+    ScrapeEngine, TaskQueue, make_result_sink, emit_event, log_prints, chrome_profile_dir
+)
+
+
+# Сколько событий может ждать потребителя, прежде чем браузеры встанут
+MAX_PENDING = 100
+
+# Сколько ждать закрытия браузеров после остановки (сек)
+SHUTDOWN_TIMEOUT = 60
+
+# Логгер журнала движка (вызов scrape(logger=...) задаёт свой)
+LOGGER_NAME = "ozon_parser"
+
+
+class StreamSink:
+    """
+    Sink для ScrapeEngine: каждый финализированный отзыв → событие 'review'
+
+    Если задан inner (sink файла результата), отзывы параллельно пишутся в файл.
+    """
+
+    def __init__(self, put, inner=None):
+        self.put = put
+        self.inner = inner
+        self.url = None
+        self.product_name = None
+
+    def open(self, url, product_name, metadata=None):
+        self.url = url
+        self.product_name = product_name
+        if self.inner:
+            self.inner.open(url, product_name, metadata)
+
+    def write(self, review):
+        if self.inner:
+            self.inner.write(review)
+        self.put({
+            'event': 'review',
+            'url': self.url,
+            'product_name': self.product_name,
+            'review': review
+        })
+
+    def close(self, stats):
+        if self.inner:
+            return self.inner.close(stats)
+        return None
+
+    def abort(self):
+        if self.inner:
+            self.inner.abort()
+
+
+def _make_put(loop, items, stop_event):
+    """Блокирующая отправка события из потока браузера в asyncio.Queue"""
+    def put(item):
+        try:
+            future = asyncio.run_coroutine_threadsafe(items.put(item), loop)
+        except RuntimeError:
+            # Цикл событий уже закрыт - потребителя нет
+            stop_event.set()
+            return
+        while True:
+            try:
+                return future.result(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                if stop_event.is_set():
+                    future.cancel()
+                    return
+    return put
+
+
+async def scrape(urls, concurrency=None, proxies=None, results_dir=None,
+                 max_reviews=None, wait=None, max_pending=MAX_PENDING, worker_events=False,
+                 profile_prefix=None, logger=None):
+    """
+    Асинхронный генератор событий парсинга
+
+    Args:
+        urls: Ссылки на товары
+        concurrency: Количество браузеров (по умолчанию BROWSER_POOL_SIZE);
+                     товаров параллельно - concurrency * TABS_PER_BROWSER
+        proxies: Список прокси; браузер N использует proxies[N % len]
+        results_dir: Если задан - отзывы также сохраняются в JSON как обычно
+        max_reviews: Лимит отзывов на товар (0 - без лимита, по умолчанию MAX_REVIEWS)
+        wait: WaitPolicy с паузами конвейера
+        max_pending: Размер очереди событий (backpressure)
+        worker_events: Отдавать также события 'worker' (статусы браузеров)
+        profile_prefix: Префикс профилей Chrome (куки сохраняются между вызовами);
+                        по умолчанию - временные профили вызова, удаляются после него
+        logger: logging.Logger для журнала движка (по умолчанию LOGGER_NAME);
+                уровень INFO - без настройки logging журнал не выводится
+
+    Yields:
+        {'event': 'review', 'url', 'product_name', 'review'} - отзыв сразу после парсинга
+        {'event': 'product', 'url', 'success', 'product_name', 'reviews', 'metadata', ...} - товар завершён
+            (после всех повторов; повторы и промежуточные части товара при
+            BUDGET_REQUEUE сами по себе не отдаются, их отзывы - отдаются)
+    """
+    urls = list(urls)
+    if not urls:
+        return
+
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue(maxsize=max_pending)
+    stop_event = threading.Event()
+    put = _make_put(loop, items, stop_event)
+
+    def progress(event, **data):
+        emit_event(event, **data)
+        if event == 'product' and data.get('requeued'):
+            return
+        if event == 'product' or (worker_events and event == 'worker'):
+            put(dict(data, event=event))
+
+    def sink_factory(directory):
+        return StreamSink(put, make_result_sink(directory) if directory else None)
+
+    temporary_profiles = profile_prefix is None
+    if temporary_profiles:
+        profile_prefix = f"api_{uuid.uuid4().hex[:8]}"
+    logger = logger or logging.getLogger(LOGGER_NAME)
+
+    engine = ScrapeEngine(
+        results_dir,
+        browsers=concurrency,
+        wait=wait,
+        sink_factory=sink_factory,
+        progress=progress,
+        max_reviews=max_reviews,
+        proxies=proxies,
+        stop_event=stop_event,
+        profile_prefix=profile_prefix
+    )
+
+    def run_worker(worker_id):
+        with log_prints(logger):
+            engine.run_worker(worker_id, url_queue)
+
+    browsers = max(1, min(engine.workers, len(urls)))
+    url_queue = TaskQueue(urls, routes=len({engine.host_id(i) for i in range(browsers)}))
+    executor = ThreadPoolExecutor(max_workers=browsers, thread_name_prefix="ozon-browser")
+    workers = [
+        loop.run_in_executor(executor, run_worker, i)
+        for i in range(browsers)
+    ]
+    finished = asyncio.gather(*workers)
+    getter = None
+
+    try:
+        while True:
+            getter = asyncio.ensure_future(items.get())
+            await asyncio.wait({getter, finished}, return_when=asyncio.FIRST_COMPLETED)
+
+            if getter.done():
+                yield getter.result()
+                continue
+
+            # Все браузеры закончили - отдаём то, что осталось в очереди
+            getter.cancel()
+            while not items.empty():
+                yield items.get_nowait()
+            break
+
+        finished.result()
+    finally:
+        stop_event.set()
+        if getter is not None and not getter.done():
+            getter.cancel()
+        # Браузеры дорабатывают текущий шаг и закрываются
+        done, _ = await asyncio.wait(workers, timeout=SHUTDOWN_TIMEOUT)
+        executor.shutdown(wait=False)
+        # Временные профили - только когда все браузеры закрыты
+        if temporary_profiles and len(done) == len(workers):
+            for host_id in {engine.host_id(i) for i in range(browsers)}:
+                shutil.rmtree(chrome_profile_dir(f"{profile_prefix}_{host_id}"), ignore_errors=True)
+
+
+async def scrape_reviews(urls, **kwargs):
+    """Только отзывы: async for review in scrape_reviews(urls)"""
+    items = scrape(urls, **kwargs)
+    try:
+        async for item in items:
+            if item['event'] == 'review':
+                yield item['review']
+    finally:
+        await items.aclose()
@@ -0,0 +1,253 @@
+"""
+Ozon Review Parser - HAR Record & Replay
+==============================================
+Запись всего трафика товара (через selenium-wire) в HAR-архив
+и воспроизведение его браузеру без сети - для воспроизводимых
+end-to-end замеров пайплайна.
+
+
+
+Author: https://github.com/KalmikOF
+"""
+
+import gzip
+import json
+import time
+import base64
+import random
+import threading
+from urllib.parse import urlsplit, parse_qsl
+
+from seleniumwire.utils import decode
+
+
+# Заголовки, которые нельзя отдавать браузеру после декодирования тела
+HOP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+# Текстовые MIME-типы сохраняются как текст, остальное - base64
+TEXT_MIME_MARKERS = ('text/', 'json', 'javascript', 'xml', 'svg', 'x-www-form-urlencoded')
+
+
+def _is_text(mime_type):
+    mime_type = (mime_type or '').lower()
+    return any(marker in mime_type for marker in TEXT_MIME_MARKERS)
+
+
+def _headers_list(headers):
+    """Заголовки → HAR; повторы (Set-Cookie) сохраняются отдельными парами"""
+    items = headers.items() if hasattr(headers, 'items') else headers
+    return [{'name': k, 'value': v} for k, v in items]
+
+
+def _content(body, mime_type):
+    """Тело в формате HAR content (text или base64)"""
+    if not body:
+        return {'size': 0, 'mimeType': mime_type, 'text': ''}
+    if _is_text(mime_type):
+        try:
+            return {'size': len(body), 'mimeType': mime_type, 'text': body.decode('utf-8')}
+        except UnicodeDecodeError:
+            pass
+    return {
+        'size': len(body),
+        'mimeType': mime_type,
+        'text': base64.b64encode(body).decode('ascii'),
+        'encoding': 'base64'
+    }
+
+
+def _content_bytes(content):
+    text = content.get('text', '')
+    if content.get('encoding') == 'base64':
+        return base64.b64decode(text)
+    return text.encode('utf-8')
+
+
+def _timestamp(dt):
+    return dt.isoformat() if dt else time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def requests_to_har(captured, page_url=""):
+    """
+    Конвертирует перехваченные selenium-wire запросы в HAR 1.2
+
+    Тела ответов сохраняются раскодированными (gzip/br/zstd снимаются),
+    как требует спецификация HAR.
+    """
+    entries = []
+
+    for request in captured:
+        response = request.response
+        if response is None:
+            continue
+
+        mime_type = response.headers.get('Content-Type', '')
+        try:
+            body = decode(response.body, response.headers.get('Content-Encoding', 'identity'))
+        except Exception:
+            body = response.body or b''
+
+        elapsed_ms = -1
+        if request.date and response.date:
+            elapsed_ms = max(0, (response.date - request.date).total_seconds() * 1000)
+
+        entry = {
+            'startedDateTime': _timestamp(request.date),
+            'time': elapsed_ms,
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'httpVersion': 'HTTP/1.1',
+                'headers': _headers_list(request.headers),
+                'queryString': [{'name': k, 'value': v} for k, v in parse_qsl(urlsplit(request.url).query)],
+                'cookies': [],
+                'headersSize': -1,
+                'bodySize': len(request.body or b'')
+            },
+            'response': {
+                'status': response.status_code,
+                'statusText': response.reason or '',
+                'httpVersion': 'HTTP/1.1',
+                'headers': _headers_list(response.headers),
+                'cookies': [],
+                'content': _content(body, mime_type),
+                'redirectURL': response.headers.get('Location', ''),
+                'headersSize': -1,
+                'bodySize': len(body)
+            },
+            'cache': {},
+            'timings': {'send': 0, 'wait': elapsed_ms, 'receive': 0}
+        }
+
+        if request.body:
+            entry['request']['postData'] = {
+                'mimeType': request.headers.get('Content-Type', ''),
+                'text': request.body.decode('utf-8', errors='replace')
+            }
+
+        entries.append(entry)
+
+    return {
+        'log': {
+            'version': '1.2',
+            'creator': {'name': 'ozon-review-parser', 'version': '6.1'},
+            'pages': [{
+                'id': 'page_1',
+                'title': page_url,
+                'startedDateTime': entries[0]['startedDateTime'] if entries else _timestamp(None),
+                'pageTimings': {}
+            }],
+            'entries': entries
+        }
+    }
+
+
+def save_har(captured, path, page_url=""):
+    """Сохраняет запросы в HAR (.har или сжатый .har.gz)"""
+    har = requests_to_har(captured, page_url)
+    data = json.dumps(har, ensure_ascii=False).encode('utf-8')
+
+    if path.endswith('.gz'):
+        with gzip.open(path, 'wb', compresslevel=6) as f:
+            f.write(data)
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    return len(har['log']['entries'])
+
+
+def load_har(path):
+    """Читает HAR (.har или .har.gz)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return json.loads(f.read().decode('utf-8'))
+
+
+def _loose_key(method, url):
+    """Ключ без query-строки (трекинговые параметры меняются между сессиями)"""
+    parts = urlsplit(url)
+    return method, f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+class HarReplayer:
+    """
+    request_interceptor для selenium-wire: отвечает браузеру из HAR
+
+    Запрос ищется сначала по точному (method, url), затем без query-строки.
+    Повторные запросы к одному URL получают записанные ответы по очереди
+    (последний повторяется). Неизвестные запросы получают 404 - сеть
+    в режиме воспроизведения не используется.
+
+    Args:
+        path: HAR-архив товара
+        latency_ms: Фиксированная задержка на каждый ответ
+        jitter_ms: Случайная добавка к задержке (0..jitter_ms)
+        recorded_timings: Воспроизводить записанное время ответа
+    """
+
+    def __init__(self, path, latency_ms=0, jitter_ms=0, recorded_timings=False):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.recorded_timings = recorded_timings
+        self._lock = threading.Lock()
+        self._exact = {}
+        self._loose = {}
+        self._cursor = {}
+        self.hits = 0
+        self.misses = 0
+
+        for entry in load_har(path)['log']['entries']:
+            req = entry['request']
+            self._exact.setdefault((req['method'], req['url']), []).append(entry)
+            self._loose.setdefault(_loose_key(req['method'], req['url']), []).append(entry)
+
+    def _next_entry(self, key, table):
+        entries = table.get(key)
+        if not entries:
+            return None
+        with self._lock:
+            index = self._cursor.get((id(table), key), 0)
+            self._cursor[(id(table), key)] = index + 1
+        return entries[min(index, len(entries) - 1)]
+
+    def _delay(self, entry):
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            delay_ms += random.uniform(0, self.jitter_ms)
+        if self.recorded_timings and entry is not None and entry.get('time', -1) > 0:
+            delay_ms += entry['time']
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+    def __call__(self, request):
+        entry = self._next_entry((request.method, request.url), self._exact)
+        if entry is None:
+            entry = self._next_entry(_loose_key(request.method, request.url), self._loose)
+
+        self._delay(entry)
+
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            request.create_response(
+                status_code=404,
+                headers={'Content-Type': 'text/plain'},
+                body=b'not in HAR archive'
+            )
+            return
+
+        with self._lock:
+            self.hits += 1
+        response = entry['response']
+        # Список пар, а не dict: повторяющиеся заголовки (Set-Cookie) не схлопываются
+        headers = [
+            (h['name'], h['value']) for h in response['headers']
+            if h['name'].lower() not in HOP_HEADERS
+        ]
+        request.create_response(
+            status_code=response['status'],
+            headers=headers,
+            body=_content_bytes(response['content'])
+        )
@@ -0,0 +1,304 @@
+"""
+Ozon Review Parser - Metrics
+==============================================
+Метрики производительности: гистограммы латентности по этапам,
+счётчики по браузерам, HTTP-эндпоинт /metrics (формат Prometheus)
+и итоговый JSON по завершении прогона.
+
+
+
+Author: https://github.com/KalmikOF
+"""
+
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+
+# Границы бакетов гистограмм латентности (секунды)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 20, 30, 60, 120)
+
+# Границы бакетов для количества кликов на отзыв
+CLICK_BUCKETS = (1, 2, 3, 5, 10, 20, 30, 50)
+
+# Границы бакетов памяти браузера (байты: 256 МБ ... 8 ГБ)
+MEMORY_BUCKETS = tuple(mb * 1024 * 1024 for mb in (256, 512, 1024, 1536, 2048, 3072, 4096, 6144, 8192))
+
+# Префикс имён метрик
+METRIC_PREFIX = "ozon_parser"
+
+
+class Histogram:
+    """Кумулятивная гистограмма в стиле Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def copy(self):
+        hist = Histogram(self.buckets)
+        hist.counts = list(self.counts)
+        hist.count = self.count
+        hist.sum = self.sum
+        hist.min = self.min
+        hist.max = self.max
+        return hist
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'avg': round(self.sum / self.count, 4) if self.count else 0,
+            'min': round(self.min, 4) if self.min is not None else 0,
+            'max': round(self.max, 4) if self.max is not None else 0
+        }
+
+
+class Metrics:
+    """
+    Потокобезопасный реестр метрик
+
+    Метки хранятся как отсортированные кортежи (ключ, значение),
+    браузер (worker) берётся из thread-local, выставленного set_worker().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._histograms = {}
+        self._counters = {}
+        self._started_at = time.time()
+
+    # ------------------------------------------
+    # Контекст браузера
+    # ------------------------------------------
+    def set_worker(self, worker_id):
+        """Привязывает метрики текущего потока к браузеру"""
+        self._local.worker = str(worker_id)
+
+    def current_worker(self):
+        return getattr(self._local, 'worker', 'main')
+
+    def reset(self):
+        """Сбрасывает все метрики (новый прогон)"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._started_at = time.time()
+
+    # ------------------------------------------
+    # Запись
+    # ------------------------------------------
+    def _key(self, name, labels):
+        labels = dict(labels or {})
+        labels.setdefault('worker', self.current_worker())
+        return name, tuple(sorted(labels.items()))
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def inc(self, name, value=1, labels=None):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    @contextmanager
+    def stage(self, stage_name):
+        """Замеряет длительность этапа (stage_duration_seconds)"""
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except BaseException:
+            outcome = 'error'
+            raise
+        finally:
+            self.observe(
+                'stage_duration_seconds',
+                time.perf_counter() - start,
+                {'stage': stage_name, 'outcome': outcome}
+            )
+
+    def timed(self, stage_name):
+        """Декоратор: замер каждого вызова функции как этапа"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # ------------------------------------------
+    # Экспорт
+    # ------------------------------------------
+    def render_prometheus(self):
+        """Текстовый формат Prometheus exposition"""
+        with self._lock:
+            histograms = {k: (h.buckets, list(h.counts), h.count, h.sum) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            uptime = time.time() - self._started_at
+
+        lines = []
+        declared = set()
+
+        def fmt_labels(labels, extra=None):
+            items = list(labels) + list(extra or [])
+            if not items:
+                return ""
+            body = ",".join(f'{k}="{_escape(v)}"' for k, v in items)
+            return "{" + body + "}"
+
+        for (name, labels), value in sorted(counters.items()):
+            full = f"{METRIC_PREFIX}_{name}"
+            if full not in declared:
+                lines.append(f"# TYPE {full} counter")
+                declared.add(full)
+            lines.append(f"{full}{fmt_labels(labels)} {value}")
+
+        for (name, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+            full = f"{METRIC_PREFIX}_{name}"
+            if full not in declared:
+                lines.append(f"# TYPE {full} histogram")
+                declared.add(full)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f"{full}_bucket{fmt_labels(labels, [('le', bound)])} {bucket_count}")
+            lines.append(f"{full}_bucket{fmt_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{full}_sum{fmt_labels(labels)} {total:.6f}")
+            lines.append(f"{full}_count{fmt_labels(labels)} {count}")
+
+        lines.append(f"# TYPE {METRIC_PREFIX}_uptime_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_uptime_seconds {uptime:.3f}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_reviews_per_minute gauge")
+        lines.append(f"{METRIC_PREFIX}_reviews_per_minute {self.reviews_per_minute():.3f}")
+
+        return "\n".join(lines) + "\n"
+
+    def reviews_per_minute(self):
+        with self._lock:
+            total = sum(v for (name, _), v in self._counters.items() if name == 'reviews_total')
+            elapsed = time.time() - self._started_at
+        return total / (elapsed / 60) if elapsed > 0 else 0.0
+
+    def summary(self):
+        """Сводка по этапам, браузерам и счётчикам для JSON-отчёта"""
+        with self._lock:
+            # Копии значений под замком: observe() меняет гистограммы на месте
+            histograms = {k: h.copy() for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            elapsed = time.time() - self._started_at
+
+        stages = {}
+        per_worker = {}
+        for (name, labels), hist in histograms.items():
+            labels = dict(labels)
+            worker = labels.pop('worker', 'main')
+            label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+            key = f"{name}[{label_str}]" if label_str else name
+            per_worker.setdefault(worker, {})[key] = hist.summary()
+
+            merged = stages.setdefault(key, Histogram(hist.buckets))
+            merged.count += hist.count
+            merged.sum += hist.sum
+            if hist.min is not None:
+                merged.min = hist.min if merged.min is None else min(merged.min, hist.min)
+                merged.max = hist.max if merged.max is None else max(merged.max, hist.max)
+
+        totals = {}
+        counters_by_worker = {}
+        for (name, labels), value in counters.items():
+            labels = dict(labels)
+            worker = labels.pop('worker', 'main')
+            label_str = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+            key = f"{name}[{label_str}]" if label_str else name
+            totals[key] = totals.get(key, 0) + value
+            counters_by_worker.setdefault(worker, {})[key] = value
+
+        return {
+            'generated_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'elapsed_seconds': round(elapsed, 3),
+            'reviews_per_minute': round(self.reviews_per_minute(), 3),
+            'stages': {k: h.summary() for k, h in sorted(stages.items())},
+            'counters': dict(sorted(totals.items())),
+            'workers': {
+                w: {
+                    'stages': per_worker.get(w, {}),
+                    'counters': counters_by_worker.get(w, {})
+                }
+                for w in sorted(set(per_worker) | set(counters_by_worker))
+            }
+        }
+
+    def dump_summary(self, path):
+        """Сохраняет сводку в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def start_metrics_server(metrics, port, host="127.0.0.1"):
+    """
+    Запускает HTTP-сервер с эндпоинтом /metrics в фоновом потоке
+
+    Returns:
+        ThreadingHTTPServer или None, если порт не задан
+    """
+    if not port:
+        return None
+
+    # http.server тянет email/html/mimetypes - только когда эндпоинт нужен
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body = metrics.render_prometheus().encode('utf-8')
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.split("?")[0] == "/summary":
+                body = json.dumps(metrics.summary(), ensure_ascii=False).encode('utf-8')
+                content_type = "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Глобальный реестр (используется парсером и GUI)
+METRICS = Metrics()
@@ -0,0 +1,626 @@
+"""
+Ozon Review Parser - Result Files
+==============================================
+Сжатые результаты (zstd), чтение результатов любого формата
+(.json, .json.zst, .jsonl, .jsonl.zst) и манифест прогона.
+
+    from ozon_results import load_results, iter_reviews
+
+    data = load_results("results/Товар_20250101_120000.jsonl.zst")
+    print(data.get('product_name'), len(data['reviews']))
+
+    for review in iter_reviews("results/Товар_20250101_120000.json"):
+        ...
+
+Словарь zstd для маленьких файлов товаров обучается по уже собранным
+результатам и указывается в OUTPUT_ZSTD_DICT:
+
+    python ozon_results.py train results/ -o results/reviews.zdict
+    python ozon_results.py cat results/Товар_20250101_120000.json.zst
+
+Манифест прогона results/manifest_{время}.jsonl - строка на товар
+(ссылка, файл, счётчики, длительность, браузер, исход):
+
+    entries, run = load_manifest("results/manifest_20250101_120000.jsonl")
+
+Повторные прогоны одного товара сводятся в один файл на товар
+(отзывы без повторов по review_uuid, старые файлы - в results/archive/):
+
+    python ozon_results.py compact results/
+
+zstandard импортируется только при работе с .zst.
+
+
+
+Author: https://github.com/KalmikOF
+"""
+
+import io
+import os
+import re
+import time
+import shutil
+import glob
+import json
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+# Расширения файлов результатов
+RESULT_SUFFIXES = ('.json', '.json.zst', '.jsonl', '.jsonl.zst')
+
+# Расширение файлов словаря zstd
+DICTIONARY_SUFFIX = '.zdict'
+
+# Размер словаря по умолчанию (как у zstd --train)
+DEFAULT_DICT_SIZE = 112640
+
+# Служебные строки JSONL: заголовок товара и итоги
+JSONL_HEADER_KEY = '_header'
+JSONL_STATS_KEY = '_stats'
+
+# Итоговая строка манифеста
+MANIFEST_RUN_KEY = '_run'
+
+# Имя файла результата: {товар}_{ГГГГММДД_ЧЧММСС}[_N].{формат}
+# (_N - несколько файлов с одним именем в одну секунду)
+RESULT_NAME_RE = re.compile(r'^(.+)_(\d{8}_\d{6})(?:_\d+)?\.(jsonl?(?:\.zst)?)$')
+
+# ID товара из ссылки (как get_product_id в ozon_parser)
+PRODUCT_ID_RE = re.compile(r'/product/(?:[^/?#]*-)?(\d+)/?')
+
+# Папка для файлов, заменённых сводным (внутри папки результатов)
+ARCHIVE_DIR = 'archive'
+
+# Имя товара, когда название не найдено: разные товары, не сводятся
+UNKNOWN_PRODUCT = 'unknown_product'
+
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Для файлов .zst нужен пакет zstandard: pip install zstandard")
+    return zstandard
+
+
+def load_dictionary(path):
+    """Словарь zstd из файла (кэшируется на процесс)"""
+    path = os.path.abspath(path)
+    with _dictionaries_lock:
+        dictionary = _dictionaries.get(path)
+        if dictionary is None:
+            with open(path, 'rb') as f:
+                dictionary = _dictionaries[path] = _zstd().ZstdCompressionDict(f.read())
+        return dictionary
+
+
+def _find_dictionary(path, dict_id):
+    """Ищет *.zdict с нужным dict_id рядом с файлом и уровнем выше"""
+    folder = os.path.dirname(os.path.abspath(path))
+    for directory in (folder, os.path.dirname(folder)):
+        for candidate in sorted(glob.glob(os.path.join(directory, '*' + DICTIONARY_SUFFIX))):
+            try:
+                dictionary = load_dictionary(candidate)
+            except (OSError, RuntimeError):
+                continue
+            if dictionary.dict_id() == dict_id:
+                return dictionary
+    return None
+
+
+def open_zstd_writer(path, level=10, dictionary=None, exclusive=False):
+    """
+    Текстовый поток, который пишет zstd-кадр в path
+
+    Args:
+        level: Уровень сжатия (1-22)
+        dictionary: Путь к словарю zstd или None
+        exclusive: FileExistsError, если файл уже есть
+    """
+    zstd = _zstd()
+    compressor = zstd.ZstdCompressor(
+        level=level,
+        dict_data=load_dictionary(dictionary) if dictionary else None,
+        write_checksum=True
+    )
+    raw = open(path, 'xb' if exclusive else 'wb')
+    return io.TextIOWrapper(compressor.stream_writer(raw, closefd=True), encoding='utf-8')
+
+
+def open_result(path, dictionary=None):
+    """
+    Текстовый поток чтения результата (сжатого или нет)
+
+    Словарь для .zst находится сам по dict_id кадра (*.zdict рядом
+    с файлом или в папке выше), если не передан явно.
+    """
+    if not path.endswith('.zst'):
+        return open(path, 'r', encoding='utf-8')
+
+    zstd = _zstd()
+    with open(path, 'rb') as f:
+        params = zstd.get_frame_parameters(f.read(18))
+
+    dict_data = None
+    if params.dict_id:
+        dict_data = load_dictionary(dictionary) if dictionary else _find_dictionary(path, params.dict_id)
+        if dict_data is None:
+            raise ValueError(f"{path}: сжат словарём {params.dict_id}, словарь (*{DICTIONARY_SUFFIX}) не найден")
+
+    decompressor = zstd.ZstdDecompressor(dict_data=dict_data)
+    return io.TextIOWrapper(decompressor.stream_reader(open(path, 'rb'), closefd=True), encoding='utf-8')
+
+
+def _is_jsonl(path):
+    return path.endswith('.jsonl') or path.endswith('.jsonl.zst')
+
+
+def iter_reviews(path, dictionary=None):
+    """Отзывы из файла результата по одному (JSONL читается потоком)"""
+    with open_result(path, dictionary) as f:
+        if _is_jsonl(path):
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if JSONL_HEADER_KEY in item or JSONL_STATS_KEY in item:
+                    continue
+                yield item
+            return
+
+        data = json.load(f)
+    for review in (data.get('reviews', []) if isinstance(data, dict) else data):
+        yield review
+
+
+def load_results(path, dictionary=None):
+    """
+    Результат товара в едином виде для всех форматов
+
+    Returns:
+        dict - поля товара (если есть в файле), 'reviews' и итоги
+    """
+    with open_result(path, dictionary) as f:
+        if not _is_jsonl(path):
+            data = json.load(f)
+            return data if isinstance(data, dict) else {'reviews': data}
+
+        result = {}
+        reviews = []
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if JSONL_HEADER_KEY in item:
+                result.update(item[JSONL_HEADER_KEY])
+            elif JSONL_STATS_KEY in item:
+                result.update(item[JSONL_STATS_KEY])
+            else:
+                reviews.append(item)
+
+    result['reviews'] = reviews
+    return result
+
+
+def find_results(*paths):
+    """Файлы результатов в папках / по маскам (без метрик и недописанных .part)"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = glob.glob(os.path.join(path, '*'))
+        else:
+            candidates = glob.glob(path)
+        for candidate in candidates:
+            name = os.path.basename(candidate)
+            if name.endswith(RESULT_SUFFIXES) and not name.startswith(('metrics_', 'manifest_')):
+                found.append(candidate)
+    return sorted(found)
+
+
+class RunManifest:
+    """
+    Индекс прогона: results/manifest_{время}.jsonl
+
+    Строка на товар дописывается сразу после товара, поэтому прерванный
+    прогон тоже оставляет индекс. finalize() добавляет последнюю строку
+    {"_run": итоги}. Путь к файлу результата - относительно манифеста.
+    """
+
+    def __init__(self, results_dir, run_id=None):
+        self.run_id = run_id or time.strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(results_dir, f"manifest_{self.run_id}.jsonl")
+        self.started_at = time.time()
+        self.outcomes = {}
+        self.totals = {'reviews': 0, 'photos': 0, 'videos': 0}
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def add(self, entry):
+        """Запись о товаре (поля со значением None не пишутся)"""
+        entry = {k: v for k, v in entry.items() if v is not None}
+        if entry.get('path'):
+            entry['path'] = os.path.relpath(entry['path'], os.path.dirname(self.path))
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            outcome = entry.get('outcome', 'unknown')
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            for key in self.totals:
+                self.totals[key] += entry.get(key, 0)
+
+    def finalize(self, **info):
+        """Итоговая строка прогона и закрытие файла; возвращает путь"""
+        with self._lock:
+            if self._file is None:
+                return self.path
+            finished_at = time.time()
+            summary = {
+                'run_id': self.run_id,
+                'started_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                'finished_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(finished_at)),
+                'duration_seconds': round(finished_at - self.started_at, 1),
+                'products': sum(self.outcomes.values()),
+                'outcomes': dict(sorted(self.outcomes.items()))
+            }
+            summary.update(self.totals)
+            summary.update(info)
+            self._file.write(json.dumps({MANIFEST_RUN_KEY: summary}, ensure_ascii=False, separators=(',', ':')) + "\n")
+            self._file.close()
+            self._file = None
+        return self.path
+
+
+def load_manifest(path):
+    """
+    Читает манифест прогона
+
+    Returns:
+        (записи о товарах, итоги прогона или None - прогон не завершён)
+    """
+    entries = []
+    summary = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                # Оборванная последняя строка (процесс убит во время записи)
+                continue
+            if MANIFEST_RUN_KEY in item:
+                summary = item[MANIFEST_RUN_KEY]
+            else:
+                entries.append(item)
+    return entries, summary
+
+
+def _product_id(url):
+    match = PRODUCT_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+
+def _review_key(review):
+    uuid = review.get('review_uuid') if isinstance(review, dict) else None
+    return uuid or json.dumps(review, ensure_ascii=False, sort_keys=True)
+
+
+def _write_result(path, header, reviews, stats, level=10, dictionary=None):
+    """Файл результата в формате по расширению (через .part)"""
+    compressed = path.endswith('.zst')
+    part = path + '.part'
+    f = open_zstd_writer(part, level, dictionary) if compressed else open(part, 'w', encoding='utf-8')
+    with f:
+        if _is_jsonl(path):
+            f.write(json.dumps({JSONL_HEADER_KEY: header}, ensure_ascii=False, separators=(',', ':')) + "\n")
+            for review in reviews:
+                f.write(json.dumps(review, ensure_ascii=False, separators=(',', ':')) + "\n")
+            f.write(json.dumps({JSONL_STATS_KEY: stats}, ensure_ascii=False, separators=(',', ':')) + "\n")
+        else:
+            data = dict(header, reviews=reviews, **stats)
+            if compressed:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+    return part
+
+
+def _compact_group(job):
+    """
+    Сводит файлы одного товара (выполняется в процессе пула)
+
+    Файлы идут от новых к старым: из повторов review_uuid остаётся
+    отзыв из самого нового файла. Сводятся только файлы с одним ID
+    товара (из product_url или манифеста прогона): разные товары под
+    одним именем сводятся каждый отдельно, файлы без ID не трогаются.
+    """
+    by_id = {}
+    for path in job['files']:
+        data = load_results(path, job['dictionary'])
+        product_id = _product_id(data.get('product_url')) or job['hints'].get(os.path.basename(path))
+        if product_id:
+            by_id.setdefault(product_id, []).append((path, product_id, data))
+
+    reports = []
+    taken = set()
+    for product_id in sorted(by_id):
+        if len(by_id[product_id]) < 2:
+            continue
+        reports.append(_merge_files(job, by_id[product_id], taken))
+    return reports
+
+
+def _merge_files(job, loaded, taken):
+    newest_path, product_id, newest = loaded[0]
+    reviews = []
+    seen = set()
+    total = 0
+    for _, _, data in loaded:
+        for review in data['reviews']:
+            total += 1
+            key = _review_key(review)
+            if key in seen:
+                continue
+            seen.add(key)
+            reviews.append(review)
+
+    header = {}
+    for _, _, data in reversed(loaded):
+        for key in ('product_url', 'product_name', 'product'):
+            if data.get(key):
+                header[key] = data[key]
+    header['parsed_at'] = newest.get('parsed_at') or time.strftime(
+        "%Y-%m-%d %H:%M:%S", time.localtime(os.path.getmtime(newest_path)))
+    header['compacted_from'] = [os.path.basename(path) for path, _, _ in loaded]
+    stats = {
+        'total_reviews': len(reviews),
+        'total_videos': sum(len(r.get('videos', [])) for r in reviews if isinstance(r, dict)),
+        'total_images': sum(len(r.get('images', [])) for r in reviews if isinstance(r, dict))
+    }
+
+    output = _output_path(newest_path, job['format'], {path for path, _, _ in loaded}, taken)
+    taken.add(output)
+    archive = {path: _archive_path(job['archive'], os.path.basename(path)) for path, _, _ in loaded}
+    report = {
+        'product_id': product_id,
+        'output': output,
+        'sources': header['compacted_from'],
+        'archived': archive,
+        'reviews_before': total,
+        'reviews': len(reviews)
+    }
+    if job['dry_run']:
+        return report
+
+    try:
+        part = _write_result(output, header, reviews, stats, job['level'], job['dictionary'])
+    except BaseException:
+        if os.path.exists(output + '.part'):
+            os.remove(output + '.part')
+        raise
+    # Старые файлы уходят в архив до замены: сводный файл может
+    # совпасть по имени с самым новым из них
+    os.makedirs(job['archive'], exist_ok=True)
+    for path, archived in archive.items():
+        shutil.move(path, archived)
+    os.replace(part, output)
+    return report
+
+
+def _output_path(newest_path, fmt, sources, taken):
+    """
+    Имя сводного файла: {товар}_{время самого нового}[_N].{fmt}
+
+    Не занимает чужой файл: другой товар с тем же именем мог
+    сохраниться в ту же секунду или в другом формате.
+    """
+    stem, timestamp, _ = RESULT_NAME_RE.match(os.path.basename(newest_path)).groups()
+    directory = os.path.dirname(newest_path)
+    output = os.path.join(directory, f"{stem}_{timestamp}.{fmt}")
+    n = 2
+    while output in taken or (os.path.exists(output) and output not in sources):
+        output = os.path.join(directory, f"{stem}_{timestamp}_{n}.{fmt}")
+        n += 1
+    return output
+
+
+def _archive_path(archive, name):
+    """Свободное имя в архиве (сводный файл мог уже архивироваться раньше)"""
+    path = os.path.join(archive, name)
+    stem, timestamp, fmt = RESULT_NAME_RE.match(name).groups()
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(archive, f"{stem}_{timestamp}~{n}.{fmt}")
+        n += 1
+    return path
+
+
+def _manifest_hints(results_dir):
+    """Имя файла результата → ID товара по манифестам прогонов"""
+    hints = {}
+    for path in _manifest_paths(results_dir):
+        entries, _ = load_manifest(path)
+        for entry in entries:
+            if entry.get('path') and entry.get('product_id'):
+                hints[os.path.basename(entry['path'])] = entry['product_id']
+    return hints
+
+
+def _manifest_paths(results_dir):
+    return sorted(glob.glob(os.path.join(results_dir, 'manifest_*.jsonl')))
+
+
+def _update_manifests(results_dir, reports):
+    """
+    Переписывает в манифестах пути к файлам, ушедшим в архив
+
+    Запись о товаре указывает на архивный файл, а compacted_into - на
+    сводный. Манифест заменяется целиком через .part; строки, которые
+    не читаются как JSON, остаются как есть.
+    """
+    moved = {}
+    for report in reports:
+        for path, archived in report['archived'].items():
+            moved[os.path.abspath(path)] = (archived, report['output'])
+
+    for manifest in _manifest_paths(results_dir):
+        base = os.path.dirname(manifest)
+        lines = []
+        changed = False
+        with open(manifest, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    lines.append(line)
+                    continue
+                target = moved.get(os.path.abspath(os.path.join(base, entry.get('path') or '')))
+                if target is None or MANIFEST_RUN_KEY in entry:
+                    lines.append(line)
+                    continue
+                archived, output = target
+                entry['path'] = os.path.relpath(archived, base)
+                entry['compacted_into'] = os.path.relpath(output, base)
+                lines.append(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n")
+                changed = True
+        if not changed:
+            continue
+        with open(manifest + '.part', 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        os.replace(manifest + '.part', manifest)
+
+
+def compact_results(results_dir, fmt='json', workers=None, archive=None,
+                    level=10, dictionary=None, dry_run=False):
+    """
+    Сводит повторные результаты товаров: один файл на товар
+
+    Файлы группируются по имени товара из {товар}_{время}.*, оба вида
+    JSON (массив отзывов и объект с reviews) и JSONL читаются одинаково.
+    Группы обрабатываются параллельно в процессах (workers, по умолчанию
+    по числу ядер). Сводный файл получает время самого нового файла,
+    исходные переносятся в archive (по умолчанию results/archive/), а
+    записи манифестов о них - на архивные пути (см. _update_manifests).
+    Файлы unknown_product и файлы без ID товара не сводятся.
+
+    Returns:
+        список отчётов по сведённым товарам
+    """
+    groups = {}
+    for path in find_results(results_dir):
+        match = RESULT_NAME_RE.match(os.path.basename(path))
+        if match and match.group(1) != UNKNOWN_PRODUCT:
+            groups.setdefault(match.group(1), []).append((match.group(2), path))
+
+    hints = _manifest_hints(results_dir)
+    jobs = []
+    for stem, files in sorted(groups.items()):
+        if len(files) < 2:
+            continue
+        jobs.append({
+            'files': [path for _, path in sorted(files, reverse=True)],
+            'hints': hints,
+            'format': fmt,
+            'archive': archive or os.path.join(results_dir, ARCHIVE_DIR),
+            'level': level,
+            'dictionary': dictionary,
+            'dry_run': dry_run
+        })
+
+    if not jobs:
+        return []
+    if workers == 1 or len(jobs) == 1:
+        batches = map(_compact_group, jobs)
+        reports = [report for batch in batches for report in batch]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = executor.map(_compact_group, jobs, chunksize=max(1, len(jobs) // 64))
+            reports = [report for batch in batches for report in batch]
+    if not dry_run:
+        _update_manifests(results_dir, reports)
+    return reports
+
+
+def train_dictionary(paths, output, dict_size=DEFAULT_DICT_SIZE, max_samples=100000):
+    """
+    Обучает словарь zstd на отзывах из готовых результатов
+
+    Образцы - отзывы в том же компактном виде, в каком их пишут сжатые
+    форматы, поэтому словарь подхватывает повторяющиеся ключи и ссылки.
+
+    Returns:
+        (dict_id, число образцов)
+    """
+    zstd = _zstd()
+    samples = []
+    for path in find_results(*paths):
+        for review in iter_reviews(path):
+            samples.append(json.dumps(review, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            if len(samples) >= max_samples:
+                break
+        if len(samples) >= max_samples:
+            break
+
+    if not samples:
+        raise ValueError("Нет отзывов для обучения словаря")
+
+    dictionary = zstd.train_dictionary(dict_size, samples)
+    with open(output, 'wb') as f:
+        f.write(dictionary.as_bytes())
+    return dictionary.dict_id(), len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Файлы результатов Ozon Parser')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train = commands.add_parser('train', help='Обучить словарь zstd по результатам')
+    train.add_argument('paths', nargs='+', help='Папки или маски файлов результатов')
+    train.add_argument('-o', '--output', default='reviews' + DICTIONARY_SUFFIX, help='Файл словаря')
+    train.add_argument('--size', type=int, default=DEFAULT_DICT_SIZE, help='Размер словаря, байт')
+
+    cat = commands.add_parser('cat', help='Вывести результат как JSON')
+    cat.add_argument('path')
+    cat.add_argument('--dict', dest='dictionary', help='Словарь zstd (иначе ищется рядом)')
+
+    compact = commands.add_parser('compact', help='Свести повторные результаты: один файл на товар')
+    compact.add_argument('results_dir', help='Папка результатов')
+    compact.add_argument('--format', default='json', choices=('json', 'json.zst', 'jsonl', 'jsonl.zst'),
+                         help='Формат сводных файлов')
+    compact.add_argument('--workers', type=int, help='Процессов (по умолчанию - по числу ядер)')
+    compact.add_argument('--archive', help=f'Куда переносить старые файлы (по умолчанию {ARCHIVE_DIR}/)')
+    compact.add_argument('--level', type=int, default=10, help='Уровень zstd для .zst')
+    compact.add_argument('--dict', dest='dictionary', help='Словарь zstd')
+    compact.add_argument('--dry-run', action='store_true', help='Только показать, что будет сведено')
+
+    args = parser.parse_args()
+
+    if args.command == 'train':
+        dict_id, count = train_dictionary(args.paths, args.output, args.size)
+        print(f"✅ Словарь {args.output}: id {dict_id}, образцов {count}")
+    elif args.command == 'cat':
+        print(json.dumps(load_results(args.path, args.dictionary), ensure_ascii=False, indent=2))
+    elif args.command == 'compact':
+        started = time.perf_counter()
+        reports = compact_results(args.results_dir, args.format, args.workers, args.archive,
+                                  args.level, args.dictionary, args.dry_run)
+        for report in reports:
+            print(f"📦 {os.path.basename(report['output'])}: {len(report['sources'])} файлов, "
+                  f"отзывов {report['reviews_before']} → {report['reviews']}")
+        files = sum(len(report['sources']) for report in reports)
+        mark = " (dry run)" if args.dry_run else ""
+        print(f"✅ Сведено товаров: {len(reports)}, файлов: {files} → {len(reports)}"
+              f" за {time.perf_counter() - started:.1f} с{mark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""
+Ozon Review Parser - Service Mode
+==============================================
+Долгоживущий сервис: пул браузеров открыт заранее и ждёт заданий,
+задания принимаются по локальному HTTP API.
+
+    python ozon_service.py --port 8765 --config config.json
+
+    POST   /jobs               {"urls": [...], "priority": "interactive" | "bulk"}
+    GET    /jobs               список заданий
+    GET    /jobs/{id}          статус задания
+    GET    /jobs/{id}/events   поток NDJSON: review / product / retry / job
+                               (?since=N - продолжить с события N)
+    DELETE /jobs/{id}          отмена: ещё не взятые товары снимаются с очереди
+    GET    /health             браузеры и очередь
+
+Интерактивные задания (по умолчанию - из одной ссылки) идут раньше
+пакетных, а первые RESERVED_WORKERS воркеров берут только их. Поэтому
+запрос одного товара не ждёт, пока закончатся товары большой пачки.
+
+
+
+Author: https://github.com/KalmikOF
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import bisect
+import argparse
+import threading
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+
+import ozon_parser
+from ozon_parser import (
+    ScrapeEngine, TaskQueue, PRIORITY_INTERACTIVE, PRIORITY_BULK, STOP_EVENT,
+    make_result_sink, emit_event, enable_event_stream, install_stop_handlers,
+    apply_config, start_metrics, save_metrics_summary, wait_for_workers
+)
+from ozon_api import StreamSink
+from ozon_metrics import METRICS
+
+
+# Порт HTTP API (только localhost, если не указан --host)
+SERVICE_PORT = 8765
+
+# Воркеров, которые берут только интерактивные задания
+RESERVED_WORKERS = 1
+
+# Событий задания в памяти для /events (старые отбрасываются)
+MAX_JOB_EVENTS = 50000
+
+# Хранить события review завершённых заданий; False - после завершения
+# остаются только итоги (product / retry / job), отзывы - в файлах результатов
+KEEP_FINISHED_REVIEWS = False
+
+# Сколько завершённых заданий помнить для /jobs
+MAX_FINISHED_JOBS = 200
+
+# Последних результатов товаров в ScrapeEngine.results (сервис работает долго)
+RECENT_RESULTS = 1000
+
+# Максимальный размер тела POST /jobs (байт)
+MAX_REQUEST_BODY = 1024 * 1024
+
+PRIORITIES = {'interactive': PRIORITY_INTERACTIVE, 'bulk': PRIORITY_BULK}
+
+
+class Job:
+    """Задание сервиса: ссылки, счётчики и события для потока /events"""
+
+    def __init__(self, job_id, urls, priority):
+        self.id = job_id
+        self.urls = urls
+        self.priority = priority
+        self.status = 'queued'
+        self.remaining = len(urls)
+        self.outcomes = {}
+        self.reviews = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.first_review_at = None
+        self.events = []   # (номер, событие); номера не меняются при удалении
+        self.next_seq = 0
+        self.cond = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    @property
+    def cancelled(self):
+        return self.status in ('cancelling', 'cancelled')
+
+    def add(self, event):
+        """Событие воркера (review / product / retry) из потока браузера"""
+        with self.cond:
+            # Товар, доработанный после отмены, не меняет итоги задания
+            if self.finished:
+                return
+            now = time.time()
+            if self.started_at is None:
+                self.started_at = now
+            if self.status == 'queued':
+                self.status = 'running'
+
+            if event['event'] == 'review':
+                self.reviews += 1
+                if self.first_review_at is None:
+                    self.first_review_at = now
+                    METRICS.observe('job_first_review_seconds', now - self.created_at,
+                                    {'priority': self.priority})
+            elif event['event'] == 'product' and not event.get('requeued'):
+                # Часть товара, отправленная в очередь (BUDGET_REQUEUE), - не итог
+                self.remaining -= 1
+                outcome = event.get('outcome', 'error')
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+            self._append(event)
+            if self.remaining <= 0:
+                self._finish('cancelled' if self.status == 'cancelling' else 'done')
+
+    def begin_cancel(self):
+        """
+        Помечает задание отменённым до снятия задач с очереди
+
+        Повтор и остаток товара ставятся в очередь только если задание
+        не отменено (TaskQueue.retry unless) - после этой пометки они
+        либо не попадут в очередь, либо будут сняты remove().
+        """
+        with self.cond:
+            if not self.finished:
+                self.status = 'cancelling'
+
+    def cancel(self, removed):
+        """Отмена: removed товаров снято с очереди, взятые - доработают"""
+        with self.cond:
+            if self.finished:
+                return
+            self.remaining -= removed
+            self.outcomes['cancelled'] = self.outcomes.get('cancelled', 0) + removed
+            self.status = 'cancelling'
+            if self.remaining <= 0:
+                self._finish('cancelled')
+            else:
+                self.cond.notify_all()
+
+    def _finish(self, status):
+        if self.finished:
+            return
+        self.status = status
+        self.finished_at = time.time()
+        self._append({'event': 'job', **self.snapshot()})
+        if not KEEP_FINISHED_REVIEWS:
+            self.events = [item for item in self.events if item[1]['event'] != 'review']
+
+    def _append(self, event):
+        self.events.append((self.next_seq, event))
+        self.next_seq += 1
+        if len(self.events) > MAX_JOB_EVENTS:
+            del self.events[:len(self.events) // 2]
+        self.cond.notify_all()
+
+    def read(self, since, timeout):
+        """
+        События начиная с номера since (ждёт новых до timeout сек)
+
+        Returns:
+            (события, номер следующего, задание завершено)
+        """
+        with self.cond:
+            if since >= self.next_seq and not self.finished:
+                self.cond.wait(timeout)
+            start = bisect.bisect_left(self.events, (since,))
+            events = [event for _, event in self.events[start:]]
+            return events, max(since, self.next_seq), self.finished
+
+    def snapshot(self):
+        def moment(value):
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value)) if value else None
+
+        return {
+            'job': self.id,
+            'status': self.status,
+            'priority': self.priority,
+            'urls': len(self.urls),
+            'remaining': self.remaining,
+            'outcomes': dict(self.outcomes),
+            'reviews': self.reviews,
+            'created_at': moment(self.created_at),
+            'started_at': moment(self.started_at),
+            'finished_at': moment(self.finished_at),
+            'first_review_seconds': round(self.first_review_at - self.created_at, 1) if self.first_review_at else None
+        }
+
+
+class ScrapeService:
+    """
+    Постоянный пул браузеров ScrapeEngine с очередью заданий
+
+    Воркеры живут всё время работы сервиса: браузеры открываются при
+    старте (warm) и после перезапусков, очередь persistent - пустая
+    очередь ждёт новых заданий. События воркера попадают в задание той
+    задачи, которую воркер сейчас выполняет (ScrapeEngine.current_task).
+    """
+
+    def __init__(self, results_dir=None, browsers=None, proxies=None,
+                 reserved=RESERVED_WORKERS, stop_event=None, manifest=None):
+        self.stop_event = stop_event or threading.Event()
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+        self.worker_status = {}
+        self.manifest = manifest
+        self.engine = ScrapeEngine(
+            results_dir,
+            browsers=browsers,
+            sink_factory=self.sink_factory,
+            progress=self.progress,
+            proxies=proxies,
+            stop_event=self.stop_event,
+            manifest=manifest,
+            warm=True,
+            reserved=reserved,
+            cancelled=self.task_cancelled
+        )
+        self.engine.results = deque(maxlen=RECENT_RESULTS)
+        routes = len({self.engine.host_id(i) for i in range(self.engine.workers)})
+        self.queue = TaskQueue(routes=routes, persistent=True)
+        self.threads = []
+
+    # ------------------------------------------
+    # Пул браузеров
+    # ------------------------------------------
+    def start(self):
+        for i in range(self.engine.workers):
+            t = threading.Thread(target=self.engine.run_worker, args=(i, self.queue),
+                                 daemon=True, name=f"ozon-browser-{i}")
+            t.start()
+            self.threads.append(t)
+
+    def shutdown(self):
+        """Останавливает воркеры (текущие товары дорабатывают шаг) и закрывает браузеры"""
+        self.stop_event.set()
+        wait_for_workers(self.threads, self.stop_event)
+        with self.jobs_lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            self.cancel(job.id)
+        if self.manifest is not None:
+            self.manifest.finalize(stopped=True)
+        if ozon_parser.GATEWAY is not None:
+            ozon_parser.GATEWAY.stop()
+
+    def current_job(self):
+        task = self.engine.current_task()
+        if task is None:
+            return None
+        return self.jobs.get(task.get('job'))
+
+    def task_cancelled(self, task):
+        """Задача отменённого задания: ошибка не повторяется, остаток не ставится в очередь"""
+        job = self.jobs.get(task.get('job'))
+        return job is not None and job.cancelled
+
+    def sink_factory(self, directory):
+        job = self.current_job()
+        put = job.add if job else (lambda item: None)
+        return StreamSink(put, make_result_sink(directory) if directory else None)
+
+    def progress(self, event, **data):
+        emit_event(event, **data)
+        if event == 'worker':
+            self.worker_status[data['worker']] = data.get('status')
+        elif event in ('product', 'retry'):
+            job = self.current_job()
+            if job:
+                job.add(dict(data, event=event))
+
+    # ------------------------------------------
+    # Задания
+    # ------------------------------------------
+    def submit(self, urls, priority=None):
+        """
+        Новое задание
+
+        Args:
+            urls: Ссылки на товары Ozon
+            priority: 'interactive' / 'bulk'; по умолчанию одна ссылка -
+                      interactive, несколько - bulk
+        """
+        urls = [url.strip() for url in urls if isinstance(url, str) and 'ozon.ru' in url]
+        if not urls:
+            raise ValueError("Нет ссылок на товары Ozon")
+        if priority is None:
+            priority = 'interactive' if len(urls) == 1 else 'bulk'
+        if priority not in PRIORITIES:
+            raise ValueError(f"Неизвестный приоритет: {priority} (interactive / bulk)")
+
+        job = Job(uuid.uuid4().hex[:12], urls, priority)
+        with self.jobs_lock:
+            self.jobs[job.id] = job
+            self._prune_jobs()
+        for url in urls:
+            self.queue.put(url, PRIORITIES[priority], job=job.id)
+
+        METRICS.inc('jobs_total', labels={'priority': priority})
+        print(f"📥 Задание {job.id}: {len(urls)} товаров ({priority})")
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.begin_cancel()
+        job.cancel(self.queue.remove(lambda task: task.get('job') == job_id))
+        return job
+
+    def _prune_jobs(self):
+        finished = [job for job in self.jobs.values() if job.finished]
+        for job in sorted(finished, key=lambda job: job.finished_at)[:-MAX_FINISHED_JOBS]:
+            del self.jobs[job.id]
+
+    def health(self):
+        with self.jobs_lock:
+            active = sum(1 for job in self.jobs.values() if not job.finished)
+        return {
+            'workers': {str(k): v for k, v in sorted(self.worker_status.items())},
+            'reserved_workers': self.engine.reserved,
+            'queued': self.queue.pending(),
+            'active_jobs': active,
+            'stopping': self.stop_event.is_set()
+        }
+
+
+def start_service_server(service, port, host="127.0.0.1"):
+    """
+    HTTP API сервиса в фоновом потоке
+
+    Returns:
+        ThreadingHTTPServer
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class ServiceHandler(BaseHTTPRequestHandler):
+        def send_json(self, code, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def route(self):
+            url = urlsplit(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            return parts, parse_qs(url.query)
+
+        def find_job(self, job_id):
+            job = service.jobs.get(job_id)
+            if job is None:
+                self.send_json(404, {'error': f"Задание {job_id} не найдено"})
+            return job
+
+        def do_GET(self):
+            parts, query = self.route()
+            if parts == ['health']:
+                self.send_json(200, service.health())
+            elif parts == ['jobs']:
+                with service.jobs_lock:
+                    jobs = list(service.jobs.values())
+                self.send_json(200, {'jobs': [job.snapshot() for job in jobs]})
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                job = self.find_job(parts[1])
+                if job:
+                    self.send_json(200, job.snapshot())
+            elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+                job = self.find_job(parts[1])
+                if job:
+                    since = query.get('since', ['0'])[0]
+                    self.stream_events(job, int(since) if since.isdigit() else 0)
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            parts, _ = self.route()
+            if parts != ['jobs']:
+                self.send_error(404)
+                return
+
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_REQUEST_BODY:
+                self.send_json(413, {'error': "Слишком большой запрос"})
+                return
+            try:
+                data = json.loads(self.rfile.read(length) or b'{}')
+                urls = data.get('urls') or ([data['url']] if data.get('url') else [])
+                job = service.submit(urls, data.get('priority'))
+            except (ValueError, AttributeError) as e:
+                self.send_json(400, {'error': str(e)})
+                return
+            self.send_json(202, job.snapshot())
+
+        def do_DELETE(self):
+            parts, _ = self.route()
+            if len(parts) != 2 or parts[0] != 'jobs':
+                self.send_error(404)
+                return
+            job = service.cancel(parts[1])
+            if job is None:
+                self.send_json(404, {'error': f"Задание {parts[1]} не найдено"})
+                return
+            self.send_json(200, job.snapshot())
+
+        def stream_events(self, job, since):
+            """NDJSON до завершения задания (соединение закрывается в конце)"""
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            try:
+                while True:
+                    events, since, finished = job.read(since, timeout=1.0)
+                    for event in events:
+                        self.wfile.write(json.dumps(event, ensure_ascii=False).encode('utf-8') + b"\n")
+                    self.wfile.flush()
+                    if (finished and not events) or service.stop_event.is_set():
+                        break
+            except (BrokenPipeError, ConnectionResetError):
+                # Клиент отключился - задание продолжается
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ozon Parser - сервис с пулом браузеров')
+    parser.add_argument('--host', default="127.0.0.1", help='Адрес HTTP API')
+    parser.add_argument('--port', type=int, default=SERVICE_PORT, help='Порт HTTP API')
+    parser.add_argument('--config', type=str, help='Конфиг-файл (как у GUI)')
+    parser.add_argument('--results', default="results", help='Папка результатов')
+    parser.add_argument('--reserved', type=int, default=RESERVED_WORKERS,
+                        help='Воркеров только для интерактивных заданий')
+    parser.add_argument('--events', action='store_true', help='Поток событий JSON в stdout')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Порт эндпоинта /metrics (по умолчанию выключен)')
+    args = parser.parse_args()
+
+    if args.events:
+        enable_event_stream()
+    install_stop_handlers()
+
+    if args.config:
+        if not os.path.exists(args.config):
+            print(f"❌ Файл не найден: {args.config}")
+            sys.exit(1)
+        with open(args.config, 'r', encoding='utf-8') as f:
+            apply_config(json.load(f))
+    if args.metrics_port is not None:
+        ozon_parser.METRICS_PORT = args.metrics_port
+
+    os.makedirs(args.results, exist_ok=True)
+    metrics_server = start_metrics()
+    manifest = None
+    if ozon_parser.RUN_MANIFEST:
+        from ozon_results import RunManifest
+        manifest = RunManifest(args.results)
+
+    service = ScrapeService(args.results, reserved=args.reserved, stop_event=STOP_EVENT, manifest=manifest)
+    service.start()
+    try:
+        server = start_service_server(service, args.port, args.host)
+    except OSError as e:
+        print(f"❌ HTTP API не запущен: {e}")
+        service.shutdown()
+        sys.exit(1)
+
+    print(f"🚀 Сервис: http://{args.host}:{args.port} "
+          f"(браузеров: {service.engine.browsers}, воркеров: {service.engine.workers}, "
+          f"только интерактивные: {service.engine.reserved})")
+    emit_event('service_started', host=args.host, port=args.port, workers=service.engine.workers)
+
+    try:
+        while not STOP_EVENT.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        print("\n⏹ Останавливаю сервис...")
+
+    server.shutdown()
+    service.shutdown()
+    save_metrics_summary(args.results)
+    if metrics_server:
+        metrics_server.shutdown()
+    emit_event('service_stopped')
+    print("✅ Сервис остановлен")
+
+
+if __name__ == "__main__":
+    main()
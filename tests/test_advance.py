@@ -0,0 +1,70 @@
+"""Переход к следующему отзыву: max_clicks против бюджета (JS через node)"""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import ozon_parser
+from ozon_parser import OZON_JS_LIBRARY, WaitPolicy
+
+NODE = shutil.which("node")
+
+# Модалка, в которой «Далее» есть, но отзыв не меняется - конец списка
+HARNESS = """
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const review = {
+    getAttribute: () => 'r0',
+    getBoundingClientRect: () => ({left: 1000})
+};
+const button = {
+    offsetParent: {},
+    getAttribute: name => name === 'aria-label' ? 'Next slide' : null,
+    click: () => {}
+};
+globalThis.window = globalThis;
+window.getComputedStyle = () => ({display: 'block', visibility: 'visible'});
+globalThis.document = {
+    querySelectorAll: selector => selector === 'button' ? [button] : [review]
+};
+eval(input.library);
+window.__ozonParser.advance('r0', input.options, result => {
+    process.stdout.write(JSON.stringify(result));
+});
+"""
+
+
+def run_advance(wait):
+    payload = {'library': OZON_JS_LIBRARY, 'options': wait.advance_options()}
+    output = subprocess.run(
+        [NODE, "-e", HARNESS], input=json.dumps(payload), capture_output=True,
+        text=True, timeout=30, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def test_default_budget_outlasts_max_clicks():
+    wait = WaitPolicy()
+    clicks_time = wait.max_clicks * wait.click_delay + wait.settle
+
+    assert ozon_parser.REVIEW_TIME_BUDGET > clicks_time
+    assert wait.step_budget() > clicks_time
+
+
+def test_small_budget_is_raised_to_clicks_time():
+    wait = WaitPolicy(click_delay=1.5, settle=2.0, poll=0.1, max_clicks=50, review_budget=60)
+    assert wait.step_budget() > 50 * 1.5 + 2.0
+    assert WaitPolicy(review_budget=0).step_budget() == 0
+    assert WaitPolicy(review_budget=600).step_budget() == 600
+
+
+@pytest.mark.skipif(NODE is None, reason="нужен node")
+def test_max_clicks_ends_list_before_budget():
+    # Настроенный бюджет (50 мс) меньше пяти кликов по 40 мс
+    wait = WaitPolicy(click_delay=0.04, settle=0, poll=0.01, max_clicks=5, review_budget=0.05)
+
+    result = run_advance(wait)
+
+    assert result == {'status': 'max_clicks', 'clicks': 5}
+
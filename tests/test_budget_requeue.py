@@ -0,0 +1,134 @@
+"""Остаток товара по бюджету времени (BUDGET_REQUEUE): следующая часть"""
+
+import time
+import threading
+
+import pytest
+
+import ozon_parser
+from ozon_parser import ScrapeEngine, WaitPolicy
+
+STEP = 1.0      # «Секунд» на переход к следующему отзыву
+BUDGET = 5.0    # Бюджет части: 5 отзывов
+
+
+class Clock:
+    """time с ручным perf_counter: переходы по отзывам двигают часы"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class Traversal:
+    """Модалка с отзывами r0..r{n-1}; каждый переход занимает STEP"""
+
+    def __init__(self, clock, count):
+        self.clock = clock
+        self.count = count
+
+    def review(self, index):
+        if index >= self.count:
+            return None
+        return {'found': True, 'review_uuid': f"r{index}", 'rating': 5, 'media_items': []}
+
+    def open(self, driver):
+        return "Товар", self.review(0)
+
+    def next(self, driver, review):
+        self.clock.now += STEP
+        return self.review(int(review['review_uuid'][1:]) + 1)
+
+
+class Sink:
+    def __init__(self, written):
+        self.written = written
+
+    def open(self, url, product_name, metadata):
+        pass
+
+    def write(self, review):
+        self.written.append(review['review_uuid'])
+
+    def close(self, stats):
+        return None
+
+    def abort(self):
+        pass
+
+
+class Driver:
+    def get(self, url):
+        pass
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ozon_parser, 'time', clock)
+    monkeypatch.setattr(ozon_parser, 'MEDIA_PRECHECK', False)
+    monkeypatch.setattr(ozon_parser, 'BUDGET_REQUEUE', True)
+
+    written = []
+    engine = ScrapeEngine(
+        None, browsers=1, tabs=1, wait=WaitPolicy(page_load=0),
+        traversal=Traversal(clock, count=30), sink_factory=lambda directory: Sink(written),
+        progress=lambda event, **data: None, max_reviews=0, product_budget=BUDGET,
+        stop_event=threading.Event()
+    )
+    engine.written = written
+    return engine
+
+
+def test_next_part_collects_reviews_after_resume_prefix(engine):
+    url = "https://www.ozon.ru/product/test-1/"
+
+    first = engine.scrape_product_page(Driver(), url, 0)
+    assert first['stop_reason'] == 'product_budget'
+    part_one = list(engine.written)
+    assert part_one == [f"r{i}" for i in range(5)]
+
+    # Проход по 5 сохранённым отзывам сам по себе длиннее бюджета
+    engine.written.clear()
+    second = engine.scrape_product_page(Driver(), url, 0, resume=first['resume'])
+    assert second['reviews_count'] == len(engine.written) > 0
+    assert not set(engine.written) & set(part_one)
+    assert engine.written[0] == "r5"
+    assert second['resume'] == part_one + engine.written
+
+
+def test_resume_prefix_loop_is_detected(engine, monkeypatch):
+    monkeypatch.setattr(ozon_parser, 'MAX_REPEATED_REVIEWS', 3)
+    # Карусель крутится только по уже сохранённым отзывам
+    engine.traversal.count = 1
+    engine.traversal.review = lambda index: {'found': True, 'review_uuid': "r0", 'media_items': []}
+
+    result = engine.scrape_product_page(Driver(), "https://www.ozon.ru/product/test-1/", 0, resume=["r0"])
+    assert result['outcome'] == 'no_reviews'
+    assert engine.written == []
+
+
+def test_max_clicks_ends_product_without_partial(engine, monkeypatch):
+    # После r2 страница исчерпала клики «Далее» - конец списка
+    engine.traversal.count = 3
+    next_review = engine.traversal.next
+
+    def advance(driver, review):
+        if review['review_uuid'] == "r2":
+            return ozon_parser.advance_to_next_review(driver, "r2", wait=engine.wait)
+        return next_review(driver, review)
+
+    monkeypatch.setattr(engine.traversal, 'next', advance)
+    monkeypatch.setattr(ozon_parser, 'call_js_async',
+                        lambda *args, **kwargs: {'status': 'max_clicks', 'clicks': 50})
+
+    result = engine.scrape_product_page(Driver(), "https://www.ozon.ru/product/test-1/", 0)
+    assert result['success']
+    assert not result.get('partial')
+    assert result.get('stop_reason') is None
+    assert engine.written == ["r0", "r1", "r2"]
@@ -0,0 +1,90 @@
+"""Сведение повторных результатов товара (compact)"""
+
+import json
+import os
+
+from ozon_results import RunManifest, compact_results, load_manifest, load_results
+
+
+def review(n):
+    return {'review_uuid': f"uuid-{n}", 'text': f"Отзыв {n}"}
+
+
+def write(directory, name, reviews, url=None):
+    path = os.path.join(directory, name)
+    data = {'product_url': url, 'reviews': reviews} if url else reviews
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return path
+
+
+def names(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+
+
+def test_same_product_is_merged(tmp_path):
+    url = "https://www.ozon.ru/product/tovar-123/"
+    write(tmp_path, "Товар_20250101_120000.json", [review(1), review(2)], url)
+    write(tmp_path, "Товар_20250102_120000.json", [review(2), review(3)], url)
+
+    reports = compact_results(str(tmp_path), workers=1)
+
+    assert [r['product_id'] for r in reports] == ["123"]
+    assert names(tmp_path) == ["Товар_20250102_120000.json"]
+    data = load_results(os.path.join(tmp_path, "Товар_20250102_120000.json"))
+    assert [r['review_uuid'] for r in data['reviews']] == ["uuid-2", "uuid-3", "uuid-1"]
+    assert len(os.listdir(tmp_path / "archive")) == 2
+
+
+def test_different_products_are_not_merged(tmp_path):
+    write(tmp_path, "Товар_20250101_120000.json", [review(1)], "https://www.ozon.ru/product/a-1/")
+    write(tmp_path, "Товар_20250102_120000.json", [review(2)], "https://www.ozon.ru/product/b-2/")
+
+    assert compact_results(str(tmp_path), workers=1) == []
+    assert names(tmp_path) == ["Товар_20250101_120000.json", "Товар_20250102_120000.json"]
+
+
+def test_files_without_id_are_not_merged(tmp_path):
+    url = "https://www.ozon.ru/product/tovar-123/"
+    write(tmp_path, "Товар_20250101_120000.json", [review(1)])
+    write(tmp_path, "Товар_20250102_120000.json", [review(2)], url)
+    write(tmp_path, "unknown_product_20250101_120000.json", [review(3)], url)
+    write(tmp_path, "unknown_product_20250102_120000.json", [review(4)], url)
+
+    assert compact_results(str(tmp_path), workers=1) == []
+    assert len(names(tmp_path)) == 4
+
+
+def test_same_second_products_do_not_overwrite_each_other(tmp_path):
+    a, b = "https://www.ozon.ru/product/a-1/", "https://www.ozon.ru/product/b-2/"
+    write(tmp_path, "Товар_20250101_120000.json", [review(1)], a)
+    write(tmp_path, "Товар_20250102_120000.json", [review(2)], a)
+    write(tmp_path, "Товар_20250102_120000_2.json", [review(3)], b)
+    write(tmp_path, "Товар_20250101_120000_2.json", [review(4)], b)
+
+    reports = compact_results(str(tmp_path), workers=1)
+
+    assert len({r['output'] for r in reports}) == 2
+    merged = {load_results(r['output'])['product_url']: r['output'] for r in reports}
+    assert [x['review_uuid'] for x in load_results(merged[a])['reviews']] == ["uuid-2", "uuid-1"]
+    assert [x['review_uuid'] for x in load_results(merged[b])['reviews']] == ["uuid-3", "uuid-4"]
+
+
+def test_manifest_follows_archived_files(tmp_path):
+    old = write(tmp_path, "Товар_20250101_120000.json", [review(1)])
+    new = write(tmp_path, "Товар_20250102_120000.json", [review(2)])
+    manifest = RunManifest(str(tmp_path), run_id="20250102_120000")
+    for path in (old, new):
+        manifest.add({'product_id': "123", 'outcome': 'success', 'path': path})
+    manifest_path = manifest.finalize()
+
+    # ID товара без product_url - из манифеста
+    reports = compact_results(str(tmp_path), workers=1)
+    assert len(reports) == 1
+
+    entries, summary = load_manifest(manifest_path)
+    assert summary is not None
+    for entry in entries:
+        assert os.path.exists(os.path.join(tmp_path, entry['path']))
+        assert entry['path'].startswith("archive")
+        assert entry['compacted_into'] == "Товар_20250102_120000.json"
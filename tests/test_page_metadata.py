@@ -0,0 +1,104 @@
+"""Счётчики товара из встроенного состояния страницы (JS через node)"""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from ozon_parser import MEDIA_COUNT_SCRIPT, PRODUCT_META_SCRIPT
+
+NODE = shutil.which("node")
+
+pytestmark = pytest.mark.skipif(NODE is None, reason="нужен node")
+
+# Минимальный document: виджеты data-state, JSON-LD и заголовок галереи
+HARNESS = """
+const input = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const widgets = input.states.map(s => ({
+    id: s.id,
+    getAttribute: () => typeof s.state === 'string' ? s.state : JSON.stringify(s.state)
+}));
+const scripts = input.ld.map(data => ({textContent: JSON.stringify(data)}));
+const document = {
+    querySelectorAll: selector => selector.includes('ld+json') ? scripts : widgets,
+    evaluate: () => ({
+        singleNodeValue: input.header ? {textContent: input.header, nextElementSibling: null} : null
+    })
+};
+const XPathResult = {FIRST_ORDERED_NODE_TYPE: 9};
+const location = {pathname: '/product/test-123/'};
+const mediaReviewCount = () => new Function('document', 'XPathResult', input.media)(document, XPathResult);
+const productName = () => null;
+const productMeta = () => new Function(
+    'document', 'location', 'mediaReviewCount', 'productName', input.meta
+)(document, location, mediaReviewCount, productName);
+process.stdout.write(JSON.stringify(input.entry === 'meta' ? productMeta() : mediaReviewCount()));
+"""
+
+
+def run_js(entry, states=(), ld=(), header=None):
+    payload = {
+        'entry': entry, 'media': MEDIA_COUNT_SCRIPT, 'meta': PRODUCT_META_SCRIPT,
+        'states': list(states), 'ld': list(ld), 'header': header
+    }
+    output = subprocess.run(
+        [NODE, "-e", HARNESS], input=json.dumps(payload), capture_output=True,
+        text=True, timeout=30, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def gallery(state, widget="state-webReviewGallery-123-default-1"):
+    return {'id': widget, 'state': state}
+
+
+@pytest.mark.parametrize("state", [
+    {'items': []},
+    {'medias': [], 'previews': []},
+    {'totalCount': 0},
+    {'paging': {'count': 0}},
+    {'items': [{'count': 0}]},
+])
+def test_media_count_unknown_for_generic_or_empty_state(state):
+    assert run_js('media', [gallery(state)]) is None
+
+
+def test_media_count_from_widget_key():
+    assert run_js('media', [gallery({'mediaCount': 0, 'items': [1]})]) == 0
+    assert run_js('media', [gallery({'mediaCount': 12, 'totalCount': 40})]) == 12
+    assert run_js('media', [gallery({'totalCount': 7})]) == 7
+
+
+def test_media_count_unknown_when_widgets_disagree():
+    states = [gallery({'mediaCount': 3}), gallery({'mediaCount': 5}, "state-webReviewPhotos-9")]
+    assert run_js('media', states) is None
+
+
+def test_media_count_ignores_other_widgets_and_uses_header():
+    states = [{'id': 'state-webPrice-1', 'state': {'mediaCount': 0}}]
+    assert run_js('media', states) is None
+    assert run_js('media', states, header="Фото и видео покупателей 15") == 15
+
+
+def product(**rating):
+    return {'@type': 'Product', 'name': 'Товар', 'aggregateRating': dict(ratingValue='4.8', **rating)}
+
+
+def test_review_count_only_from_review_count():
+    assert run_js('meta', ld=[product(reviewCount='42', ratingCount='90')])['review_count'] == 42
+    assert run_js('meta', ld=[product(reviewCount=0)])['review_count'] == 0
+
+
+def test_review_count_unknown_without_review_count():
+    meta = run_js('meta', ld=[product(ratingCount='90')])
+    assert meta['review_count'] is None
+    assert meta['rating'] == 4.8
+
+    score = {'id': 'state-webSingleProductScore-1', 'state': {'totalCount': 0, 'reviews': {'reviewsCount': 0}}}
+    assert run_js('meta', [score])['review_count'] is None
+
+
+def test_review_count_from_score_widget():
+    score = {'id': 'state-webReviewShort-1', 'state': {'reviewCount': 5}}
+    assert run_js('meta', [score])['review_count'] == 5
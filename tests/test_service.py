@@ -0,0 +1,79 @@
+"""Задания сервиса: отмена, повторы и события завершённого задания"""
+
+import ozon_service
+from ozon_service import Job, ScrapeService
+
+
+def test_cancel_stops_retries_of_taken_products():
+    service = ScrapeService(None, browsers=1)
+    job = service.submit(["https://www.ozon.ru/product/a-1/", "https://www.ozon.ru/product/b-2/"])
+    task = service.queue.get()
+    service.engine.local.task = task
+
+    service.cancel(job.id)
+    assert job.status == 'cancelling'
+    assert job.remaining == 1
+    assert service.queue.pending() == 0
+
+    # Ошибка взятого товара после отмены не повторяется
+    result = service.engine.fail(0, service.queue, task, TimeoutError("страница"), 'transient')
+    assert result['outcome'] == 'cancelled'
+    assert service.queue.pending() == 0
+    assert job.status == 'cancelled'
+    assert job.outcomes == {'cancelled': 2}
+
+
+def test_requeue_is_refused_once_cancel_begins():
+    service = ScrapeService(None, browsers=1)
+    job = service.submit(["https://www.ozon.ru/product/a-1/"])
+    task = service.queue.get()
+
+    # Отмена началась, пока воркер решал, ставить ли остаток в очередь
+    job.begin_cancel()
+    requeued = service.queue.retry(dict(task, part=2, attempt=0), 0, 0, unless=service.task_cancelled)
+
+    assert not requeued
+    assert service.queue.pending() == 0
+
+
+def test_finished_job_ignores_late_events():
+    job = Job("j1", ["https://www.ozon.ru/product/a-1/"], 'bulk')
+    job.add({'event': 'product', 'outcome': 'success'})
+    assert job.status == 'done'
+
+    job.add({'event': 'product', 'outcome': 'error'})
+    job.add({'event': 'review', 'review_uuid': "late"})
+
+    assert job.outcomes == {'success': 1}
+    assert job.remaining == 0
+
+
+def test_finished_job_keeps_only_summaries(monkeypatch):
+    monkeypatch.setattr(ozon_service, 'KEEP_FINISHED_REVIEWS', False)
+    job = Job("j1", ["https://www.ozon.ru/product/a-1/"], 'bulk')
+    job.add({'event': 'review', 'review_uuid': "r1"})
+    job.add({'event': 'review', 'review_uuid': "r2"})
+
+    events, since, finished = job.read(0, timeout=0)
+    assert [event['event'] for event in events] == ['review', 'review']
+    assert since == 2 and not finished
+
+    job.add({'event': 'product', 'outcome': 'success'})
+    events, since, finished = job.read(0, timeout=0)
+    assert [event['event'] for event in events] == ['product', 'job']
+    assert since == 4 and finished
+
+    # Номера событий не сдвигаются после удаления отзывов
+    events, since, _ = job.read(3, timeout=0)
+    assert [event['event'] for event in events] == ['job']
+    assert job.read(since, timeout=0)[0] == []
+
+
+def test_finished_reviews_kept_when_enabled(monkeypatch):
+    monkeypatch.setattr(ozon_service, 'KEEP_FINISHED_REVIEWS', True)
+    job = Job("j1", ["https://www.ozon.ru/product/a-1/"], 'bulk')
+    job.add({'event': 'review', 'review_uuid': "r1"})
+    job.add({'event': 'product', 'outcome': 'success'})
+
+    events, _, _ = job.read(0, timeout=0)
+    assert [event['event'] for event in events] == ['review', 'product', 'job']
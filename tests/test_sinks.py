@@ -0,0 +1,96 @@
+"""Потоковая запись результатов товара и дедупликация UUID"""
+
+import json
+import os
+import threading
+import uuid
+
+import ozon_parser
+from ozon_parser import JsonArraySink, JsonLinesSink, UuidFilter
+from ozon_results import RESULT_NAME_RE, load_results
+
+
+def review(n):
+    return {'review_uuid': f"uuid-{n}", 'text': f"Отзыв {n}"}
+
+
+def test_same_name_in_same_second_gets_separate_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(ozon_parser.time, 'strftime', lambda fmt, *args: "20250101_120000")
+    first, second = JsonArraySink(str(tmp_path), wrap=True), JsonArraySink(str(tmp_path), wrap=True)
+
+    first.open("https://www.ozon.ru/product/a-1/", "Товар")
+    second.open("https://www.ozon.ru/product/b-2/", "Товар")
+    first.write(review(1))
+    second.write(review(2))
+    first_path = first.close({'total_reviews': 1})
+    second_path = second.close({'total_reviews': 1})
+
+    assert first_path != second_path
+    assert load_results(first_path)['reviews'] == [review(1)]
+    assert load_results(second_path)['reviews'] == [review(2)]
+    for path in (first_path, second_path):
+        stem, timestamp, fmt = RESULT_NAME_RE.match(os.path.basename(path)).groups()
+        assert (stem, timestamp, fmt) == ("Товар", "20250101_120000", "json")
+
+
+def test_finished_file_is_not_overwritten(tmp_path, monkeypatch):
+    monkeypatch.setattr(ozon_parser.time, 'strftime', lambda fmt, *args: "20250101_120000")
+    sink = JsonLinesSink(str(tmp_path))
+    sink.open("https://www.ozon.ru/product/a-1/", "Товар")
+    sink.write(review(1))
+    done = sink.close({'total_reviews': 1})
+
+    again = JsonLinesSink(str(tmp_path))
+    again.open("https://www.ozon.ru/product/a-1/", "Товар")
+    again.write(review(2))
+    path = again.close({'total_reviews': 1})
+
+    assert path != done
+    assert load_results(done)['reviews'] == [review(1)]
+    assert load_results(path)['reviews'] == [review(2)]
+
+
+def test_concurrent_sinks_do_not_share_part_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(ozon_parser.time, 'strftime', lambda fmt, *args: "20250101_120000")
+    paths = []
+    barrier = threading.Barrier(8)
+
+    def worker(n):
+        sink = JsonArraySink(str(tmp_path))
+        barrier.wait()
+        sink.open("https://www.ozon.ru/product/a-1/", "Товар")
+        for i in range(50):
+            sink.write(dict(review(i), worker=n))
+        paths.append(sink.close({}))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(paths)) == 8
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            reviews = json.load(f)
+        assert len(reviews) == 50
+        assert len({r['worker'] for r in reviews}) == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_abort_removes_part_file(tmp_path):
+    sink = JsonArraySink(str(tmp_path))
+    sink.open("https://www.ozon.ru/product/a-1/", "Товар")
+    sink.write(review(1))
+    sink.abort()
+    assert os.listdir(tmp_path) == []
+
+
+def test_uuid_filter_has_no_false_positives():
+    seen = UuidFilter()
+    uuids = [str(uuid.uuid4()) for _ in range(50000)]
+    for value in uuids:
+        assert value not in seen
+        seen.add(value)
+    assert all(value in seen for value in uuids)
+    assert len(seen) == len(uuids)
@@ -0,0 +1,128 @@
+"""TaskQueue, classify_failure и разбор итогов прогона"""
+
+import queue
+import threading
+import time
+
+import pytest
+
+import ozon_parser
+from ozon_parser import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, BudgetExceeded, ProductBlocked, ProxyAuthLost,
+    TaskQueue, classify_failure, is_final_failure,
+)
+
+
+def urls(tasks):
+    return [task['url'] for task in tasks]
+
+
+def test_interactive_lane_goes_first():
+    tasks = TaskQueue(["b1", "b2"])
+    tasks.put("i1", priority=PRIORITY_INTERACTIVE)
+
+    taken = [tasks.get() for _ in range(3)]
+
+    assert urls(taken) == ["i1", "b1", "b2"]
+    assert taken[0]['priority'] == PRIORITY_INTERACTIVE
+    assert taken[1]['priority'] == PRIORITY_BULK
+
+
+def test_lanes_filter_leaves_other_priorities():
+    tasks = TaskQueue(["b1"])
+    stop = threading.Event()
+    timer = threading.Timer(0.2, stop.set)
+    timer.start()
+    try:
+        with pytest.raises(queue.Empty):
+            tasks.get(stop_event=stop, lanes=(PRIORITY_INTERACTIVE,))
+    finally:
+        timer.cancel()
+    assert tasks.pending() == 1
+
+
+def test_retry_waits_for_delay():
+    tasks = TaskQueue(["a"])
+    task = tasks.get()
+    tasks.retry(task, 0.3, route=0)
+    tasks.task_done()
+
+    started = time.monotonic()
+    retried = tasks.get(route=0)
+
+    assert time.monotonic() - started >= 0.25
+    assert retried['url'] == "a"
+    assert retried['attempt'] == 2
+    assert retried['last_route'] == 0
+
+
+def test_retry_goes_to_other_route_first(monkeypatch):
+    monkeypatch.setattr(ozon_parser, "RETRY_REROUTE_GRACE", 0.3)
+    tasks = TaskQueue(["a"], routes=2)
+    tasks.retry(tasks.get(route=0), 0, route=0)
+    tasks.task_done()
+    tasks.put("b")
+
+    # Тот же браузер получает следующую задачу, а не свой повтор
+    assert tasks.get(route=0)['url'] == "b"
+    assert tasks.get(route=1)['url'] == "a"
+
+
+def test_retry_returns_to_same_route_after_grace(monkeypatch):
+    monkeypatch.setattr(ozon_parser, "RETRY_REROUTE_GRACE", 0.2)
+    tasks = TaskQueue(["a"], routes=2)
+    tasks.retry(tasks.get(route=0), 0, route=0)
+    tasks.task_done()
+
+    started = time.monotonic()
+    retried = tasks.get(route=0)
+
+    assert retried['url'] == "a"
+    assert time.monotonic() - started >= 0.15
+
+
+def test_empty_queue_raises_when_nothing_in_flight():
+    tasks = TaskQueue(["a"])
+    tasks.get()
+    tasks.task_done()
+    with pytest.raises(queue.Empty):
+        tasks.get()
+
+
+def test_remove_drops_ready_and_delayed():
+    tasks = TaskQueue()
+    tasks.put("a", job="j1")
+    tasks.put("b", job="j2")
+    tasks.retry(dict(url="c", attempt=1, priority=PRIORITY_BULK, job="j1"), 60, route=0)
+
+    assert tasks.remove(lambda task: task.get('job') == "j1") == 2
+    assert tasks.pending() == 1
+    assert tasks.get()['url'] == "b"
+
+
+@pytest.mark.parametrize("error, kind", [
+    (ProductBlocked("captcha"), 'blocked'),
+    (RuntimeError("HTTP 429 Too Many Requests"), 'blocked'),
+    (BudgetExceeded("шаг"), 'transient'),
+    (TimeoutError("страница"), 'transient'),
+    (ProxyAuthLost("auth"), 'transient'),
+    (type("TimeoutException", (Exception,), {})("load"), 'transient'),
+    (RuntimeError("net::ERR_PROXY_CONNECTION_FAILED"), 'transient'),
+    (ValueError("нет названия товара"), 'permanent'),
+])
+def test_classify_failure(error, kind):
+    assert classify_failure(error) == kind
+
+
+def test_final_failure_only_permanent_or_exhausted(monkeypatch):
+    monkeypatch.setattr(ozon_parser, "RETRY_MAX_ATTEMPTS", 3)
+
+    assert is_final_failure({'success': False, 'failure': 'permanent', 'attempts': 1})
+    assert is_final_failure({'success': False, 'failure': 'transient', 'attempts': 3})
+    assert is_final_failure({'success': False, 'failure': 'blocked', 'attempts': 3})
+    # Прервано остановкой / отменой до исчерпания попыток
+    assert not is_final_failure({'success': False, 'failure': 'transient', 'attempts': 1,
+                                 'outcome': 'cancelled'})
+    assert not is_final_failure({'success': False, 'outcome': 'no_reviews'})
+    assert not is_final_failure({'success': False, 'outcome': 'no_media'})
+    assert not is_final_failure({'success': True})